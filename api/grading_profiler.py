@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Grading Pipeline Profiler
+Opt-in, sampled profiling of grading requests
+
+Features:
+- Samples a configurable fraction of requests
+- cProfile statistics and a JSON report per profiled request
+- Collapsed-stack files ready for flamegraph.pl / speedscope
+- Optional TensorFlow profiler trace of the profiled block (TensorBoard)
+- CLI to aggregate profiles across many requests
+
+Usage:
+    export GRADING_PROFILE_DIR=./profiles
+    export GRADING_PROFILE_SAMPLE_RATE=0.05
+    python grading_profiler.py ./profiles --output merged.collapsed
+"""
+
+import argparse
+import cProfile
+import glob
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Only one TensorFlow profiler session may run per process
+_tensorflow_trace_lock = threading.Lock()
+
+# Default for ``profiler`` arguments: use the GRADING_PROFILE_* configuration
+# (pass None to disable profiling explicitly)
+ENV_PROFILER = object()
+
+
+class StackSampler:
+    """
+    Background thread that samples the call stack of one thread at a fixed interval
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="grading-stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def to_collapsed(self) -> str:
+        """Render samples in the collapsed-stack format (one "stack count" per line)"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class GradingProfiler:
+    """
+    Samples grading requests and writes per-request profiles to a local directory
+    """
+
+    def __init__(self, output_dir: str, sample_rate: float = 0.01,
+                 sampling_interval: float = 0.005, trace_tensorflow: bool = False,
+                 top_n: int = 25):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.sampling_interval = sampling_interval
+        self.trace_tensorflow = trace_tensorflow
+        self.top_n = top_n
+        os.makedirs(output_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional['GradingProfiler']:
+        """
+        Build a profiler from GRADING_PROFILE_* environment variables
+        
+        Returns None when unset or misconfigured, so a bad value never stops
+        the grading backends from loading.
+        """
+        output_dir = os.environ.get('GRADING_PROFILE_DIR')
+        if not output_dir:
+            return None
+        try:
+            return cls(
+                output_dir,
+                sample_rate=float(os.environ.get('GRADING_PROFILE_SAMPLE_RATE', '0.01')),
+                sampling_interval=float(os.environ.get('GRADING_PROFILE_INTERVAL', '0.005')),
+                trace_tensorflow=os.environ.get('GRADING_PROFILE_TF_TRACE', '').lower() in ('1', 'true', 'yes')
+            )
+        except (ValueError, OSError) as e:
+            logger.warning(f"Invalid GRADING_PROFILE_* configuration, profiling disabled: {e}")
+            return None
+
+    def should_sample(self) -> bool:
+        """Decide whether the current request is profiled"""
+        return random.random() < self.sample_rate
+
+    @contextmanager
+    def profile(self, label: str, metadata: Optional[Dict] = None):
+        """
+        Profile the enclosed block and write its report files
+        """
+        request_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        base_path = os.path.join(self.output_dir, request_id)
+
+        sampler = StackSampler(threading.get_ident(), self.sampling_interval)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active (e.g. a concurrent request on Python 3.12+)
+            profiler = None
+
+        tf_trace_dir = self._start_tensorflow_trace(base_path)
+        sampler.start()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield request_id
+        finally:
+            wall_time = time.perf_counter() - wall_start
+            cpu_time = time.thread_time() - cpu_start
+            sampler.stop()
+            if profiler is not None:
+                profiler.disable()
+            if tf_trace_dir is not None:
+                self._stop_tensorflow_trace()
+
+            try:
+                self._write_report(base_path, request_id, label, metadata or {},
+                                   wall_time, cpu_time, profiler, sampler, tf_trace_dir)
+            except OSError as e:
+                logger.error(f"Error writing profile {request_id}: {e}")
+
+    def _start_tensorflow_trace(self, base_path: str) -> Optional[str]:
+        """
+        Start a TensorFlow profiler session, if enabled and free
+        
+        The trace covers whatever TensorFlow work runs inside the profiled block;
+        today that is building and compiling the Keras model, as grading does not
+        run CNN inference yet.
+        """
+        if not self.trace_tensorflow or not _tensorflow_trace_lock.acquire(blocking=False):
+            return None
+        try:
+            import tensorflow as tf
+            trace_dir = f"{base_path}.tf"
+            tf.profiler.experimental.start(trace_dir)
+            return trace_dir
+        except Exception as e:
+            logger.warning(f"TensorFlow trace unavailable: {e}")
+            _tensorflow_trace_lock.release()
+            return None
+
+    def _stop_tensorflow_trace(self):
+        try:
+            import tensorflow as tf
+            tf.profiler.experimental.stop()
+        except Exception as e:
+            logger.warning(f"Error stopping TensorFlow trace: {e}")
+        finally:
+            _tensorflow_trace_lock.release()
+
+    def _write_report(self, base_path: str, request_id: str, label: str, metadata: Dict,
+                      wall_time: float, cpu_time: float, profiler: Optional[cProfile.Profile],
+                      sampler: StackSampler, tf_trace_dir: Optional[str]):
+        """Write the collapsed stacks, cProfile dump and JSON report for one request"""
+        files = {}
+
+        with open(f"{base_path}.collapsed", 'w') as f:
+            f.write(sampler.to_collapsed())
+        files['collapsed'] = f"{request_id}.collapsed"
+
+        top_functions = []
+        if profiler is not None:
+            profiler.dump_stats(f"{base_path}.prof")
+            files['cprofile'] = f"{request_id}.prof"
+            top_functions = top_functions_from_stats(pstats.Stats(profiler), self.top_n)
+
+        if tf_trace_dir is not None:
+            files['tensorflow_trace'] = os.path.basename(tf_trace_dir)
+
+        report = {
+            'request_id': request_id,
+            'label': label,
+            'metadata': metadata,
+            'timestamp': datetime.now().isoformat(),
+            'wall_time_ms': round(wall_time * 1000, 3),
+            'cpu_time_ms': round(cpu_time * 1000, 3),
+            'stack_samples': sum(sampler.stacks.values()),
+            'top_functions': top_functions,
+            'files': files
+        }
+        with open(f"{base_path}.json", 'w') as f:
+            json.dump(report, f, indent=2)
+
+        logger.info(f"Profiled {label} in {report['wall_time_ms']} ms -> {base_path}.json")
+
+
+def top_functions_from_stats(stats: pstats.Stats, limit: int, sort_key: str = 'cumulative') -> List[Dict]:
+    """
+    Summarize the most expensive functions from cProfile statistics
+    """
+    index = {'cumulative': 3, 'tottime': 2, 'calls': 1}[sort_key]
+    rows = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append((f"{name} ({os.path.basename(filename)}:{line})", calls, total, cumulative))
+    rows.sort(key=lambda row: row[index], reverse=True)
+    return [
+        {
+            'function': function,
+            'calls': calls,
+            'total_time_ms': round(total * 1000, 3),
+            'cumulative_time_ms': round(cumulative * 1000, 3)
+        }
+        for function, calls, total, cumulative in rows[:limit]
+    ]
+
+
+def aggregate_profiles(profile_dir: str, output: Optional[str] = None,
+                       top_n: int = 25, sort_key: str = 'cumulative') -> Dict:
+    """
+    Merge collapsed stacks and cProfile dumps from many profiled requests
+    """
+    reports = []
+    for path in sorted(glob.glob(os.path.join(profile_dir, '*.json'))):
+        with open(path) as f:
+            reports.append(json.load(f))
+
+    stacks: Counter = Counter()
+    for path in glob.glob(os.path.join(profile_dir, '*.collapsed')):
+        with open(path) as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack:
+                    stacks[stack] += int(count)
+
+    if output:
+        with open(output, 'w') as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    top_functions = []
+    prof_files = glob.glob(os.path.join(profile_dir, '*.prof'))
+    if prof_files:
+        stats = pstats.Stats(*prof_files, stream=io.StringIO())
+        top_functions = top_functions_from_stats(stats, top_n, sort_key)
+
+    wall_times = sorted(report['wall_time_ms'] for report in reports)
+
+    def percentile(p: float) -> float:
+        if not wall_times:
+            return 0.0
+        return wall_times[min(int(len(wall_times) * p), len(wall_times) - 1)]
+
+    return {
+        'requests': len(reports),
+        'wall_time_ms': {
+            'mean': round(sum(wall_times) / len(wall_times), 3) if wall_times else 0.0,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'max': wall_times[-1] if wall_times else 0.0
+        },
+        'slowest_requests': [
+            {'request_id': report['request_id'], 'label': report['label'], 'wall_time_ms': report['wall_time_ms']}
+            for report in sorted(reports, key=lambda report: report['wall_time_ms'], reverse=True)[:5]
+        ],
+        'stack_samples': sum(stacks.values()),
+        'collapsed_output': output,
+        'top_functions': top_functions
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Aggregate grading profiles across many requests")
+    parser.add_argument('profile_dir', help="Directory written by GradingProfiler")
+    parser.add_argument('--output', '-o', help="Write merged collapsed stacks to this file")
+    parser.add_argument('--top', type=int, default=25, help="Number of functions to report")
+    parser.add_argument('--sort', choices=['cumulative', 'tottime', 'calls'], default='cumulative')
+    args = parser.parse_args(argv)
+
+    summary = aggregate_profiles(args.profile_dir, args.output, args.top, args.sort)
+    print(json.dumps(summary, indent=2))
+
+
+# Example usage
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Grading Result Objects
+Compact, typed containers for grading output shared by both grading systems
+
+Features:
+- __slots__ classes holding plain Python floats (no NumPy scalars)
+- to_dict() compatibility view matching the original response dicts
+- Compact JSON serialization for storing or exporting results
+- Struct-packed binary form for holding and shipping bulk results
+"""
+
+import json
+import struct
+from typing import Dict, List, Optional
+
+BINARY_FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<B5d4dI')
+_LENGTH = struct.Struct('<H')
+_DISTANCE = struct.Struct('<B')
+_NONE_LENGTH = 0xFFFF
+
+
+def _pack_str(value: Optional[str], buffer: bytearray):
+    """Append a length-prefixed UTF-8 string (or a None marker)"""
+    if value is None:
+        buffer += _LENGTH.pack(_NONE_LENGTH)
+        return
+    encoded = str(value).encode('utf-8')
+    if len(encoded) >= _NONE_LENGTH:
+        raise ValueError("String too long for binary grading result")
+    buffer += _LENGTH.pack(len(encoded))
+    buffer += encoded
+
+
+def _unpack_str(data: bytes, offset: int):
+    """Read a length-prefixed string, returning (value, new_offset)"""
+    (length,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    if length == _NONE_LENGTH:
+        return None, offset
+    return data[offset:offset + length].decode('utf-8'), offset + length
+
+
+def _pack_count(count: int, buffer: bytearray):
+    """Append a list length, keeping the None marker unambiguous"""
+    if count >= _NONE_LENGTH:
+        raise ValueError("List too long for binary grading result")
+    buffer += _LENGTH.pack(count)
+
+
+def _pack_str_list(values: List[str], buffer: bytearray):
+    """Append a count-prefixed list of strings"""
+    _pack_count(len(values), buffer)
+    for value in values:
+        _pack_str(value, buffer)
+
+
+def _unpack_str_list(data: bytes, offset: int):
+    """Read a count-prefixed list of strings, returning (values, new_offset)"""
+    (count,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    values = []
+    for _ in range(count):
+        value, offset = _unpack_str(data, offset)
+        values.append(value)
+    return values, offset
+
+
+class QualityMetrics:
+    """
+    Handwriting quality metrics produced by image analysis
+    """
+
+    __slots__ = ('edge_density', 'stroke_consistency', 'line_straightness', 'legibility_score')
+
+    def __init__(self, edge_density: float, stroke_consistency: float,
+                 line_straightness: float, legibility_score: float):
+        # float() also unwraps NumPy scalars so the values serialize natively
+        self.edge_density = float(edge_density)
+        self.stroke_consistency = float(stroke_consistency)
+        self.line_straightness = float(line_straightness)
+        self.legibility_score = float(legibility_score)
+
+    @classmethod
+    def from_dict(cls, metrics: Dict[str, float]) -> 'QualityMetrics':
+        """Build metrics from the dict returned by analyze_handwriting_quality"""
+        return cls(
+            metrics['edge_density'],
+            metrics['stroke_consistency'],
+            metrics['line_straightness'],
+            metrics['legibility_score']
+        )
+
+    def to_dict(self) -> Dict[str, float]:
+        """Dict view compatible with the original quality_metrics payload"""
+        return {
+            'edge_density': self.edge_density,
+            'stroke_consistency': self.stroke_consistency,
+            'line_straightness': self.line_straightness,
+            'legibility_score': self.legibility_score
+        }
+
+    def __repr__(self) -> str:
+        return f"QualityMetrics({self.to_dict()!r})"
+
+
+class GradingResult:
+    """
+    Result of grading a single assignment
+    """
+
+    __slots__ = (
+        'overall_score', 'accuracy', 'completeness', 'legibility', 'presentation',
+        'grade', 'feedback', 'suggestions', 'time_spent', 'quality_metrics',
+        'processing_timestamp', 'assignment_type',
+        'submission_id', 'perceptual_hash', 'near_duplicates', 'reused_from'
+    )
+
+    # Optional fields are only emitted by to_dict() when set
+    _OPTIONAL_FIELDS = ('submission_id', 'perceptual_hash', 'near_duplicates', 'reused_from')
+
+    def __init__(self, overall_score: float, accuracy: float, completeness: float,
+                 legibility: float, presentation: float, grade: str,
+                 feedback: List[str], suggestions: List[str], time_spent: int,
+                 quality_metrics: QualityMetrics, processing_timestamp: str,
+                 assignment_type: str, submission_id: Optional[str] = None,
+                 perceptual_hash: Optional[str] = None,
+                 near_duplicates: Optional[List[Dict]] = None,
+                 reused_from: Optional[str] = None):
+        self.overall_score = float(overall_score)
+        self.accuracy = float(accuracy)
+        self.completeness = float(completeness)
+        self.legibility = float(legibility)
+        self.presentation = float(presentation)
+        self.grade = grade
+        self.feedback = feedback
+        self.suggestions = suggestions
+        self.time_spent = int(time_spent)
+        self.quality_metrics = quality_metrics
+        self.processing_timestamp = processing_timestamp
+        self.assignment_type = assignment_type
+        self.submission_id = submission_id
+        self.perceptual_hash = perceptual_hash
+        self.near_duplicates = near_duplicates
+        self.reused_from = reused_from
+
+    def replace(self, **changes) -> 'GradingResult':
+        """Return a copy with the given fields replaced"""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return GradingResult(**values)
+
+    def to_dict(self) -> Dict:
+        """Dict view compatible with the original grade_assignment response"""
+        result = {
+            'overall_score': self.overall_score,
+            'accuracy': self.accuracy,
+            'completeness': self.completeness,
+            'legibility': self.legibility,
+            'presentation': self.presentation,
+            'grade': self.grade,
+            'feedback': list(self.feedback),
+            'suggestions': list(self.suggestions),
+            'time_spent': self.time_spent,
+            'quality_metrics': self.quality_metrics.to_dict(),
+            'processing_timestamp': self.processing_timestamp,
+            'assignment_type': self.assignment_type
+        }
+        for name in self._OPTIONAL_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                result[name] = value
+        return result
+
+    def to_json(self) -> str:
+        """Serialize to compact JSON"""
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize to the compact struct-packed binary form
+        """
+        metrics = self.quality_metrics
+        buffer = bytearray(_HEADER.pack(
+            BINARY_FORMAT_VERSION,
+            self.overall_score, self.accuracy, self.completeness,
+            self.legibility, self.presentation,
+            metrics.edge_density, metrics.stroke_consistency,
+            metrics.line_straightness, metrics.legibility_score,
+            self.time_spent
+        ))
+        _pack_str(self.grade, buffer)
+        _pack_str(self.processing_timestamp, buffer)
+        _pack_str(self.assignment_type, buffer)
+        _pack_str(self.submission_id, buffer)
+        _pack_str(self.perceptual_hash, buffer)
+        _pack_str(self.reused_from, buffer)
+        _pack_str_list(self.feedback, buffer)
+        _pack_str_list(self.suggestions, buffer)
+
+        if self.near_duplicates is None:
+            buffer += _LENGTH.pack(_NONE_LENGTH)
+        else:
+            _pack_count(len(self.near_duplicates), buffer)
+            for match in self.near_duplicates:
+                _pack_str(match['submission_id'], buffer)
+                buffer += _DISTANCE.pack(match['distance'])
+        return bytes(buffer)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'GradingResult':
+        """
+        Rebuild a result from its binary form
+        """
+        values = _HEADER.unpack_from(data, 0)
+        if values[0] != BINARY_FORMAT_VERSION:
+            raise ValueError(f"Unsupported grading result format version: {values[0]}")
+        offset = _HEADER.size
+
+        grade, offset = _unpack_str(data, offset)
+        processing_timestamp, offset = _unpack_str(data, offset)
+        assignment_type, offset = _unpack_str(data, offset)
+        submission_id, offset = _unpack_str(data, offset)
+        perceptual_hash, offset = _unpack_str(data, offset)
+        reused_from, offset = _unpack_str(data, offset)
+        feedback, offset = _unpack_str_list(data, offset)
+        suggestions, offset = _unpack_str_list(data, offset)
+
+        (count,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        near_duplicates = None
+        if count != _NONE_LENGTH:
+            near_duplicates = []
+            for _ in range(count):
+                duplicate_id, offset = _unpack_str(data, offset)
+                (distance,) = _DISTANCE.unpack_from(data, offset)
+                offset += _DISTANCE.size
+                near_duplicates.append({'submission_id': duplicate_id, 'distance': distance})
+
+        return cls(
+            overall_score=values[1],
+            accuracy=values[2],
+            completeness=values[3],
+            legibility=values[4],
+            presentation=values[5],
+            grade=grade,
+            feedback=feedback,
+            suggestions=suggestions,
+            time_spent=values[10],
+            quality_metrics=QualityMetrics(*values[6:10]),
+            processing_timestamp=processing_timestamp,
+            assignment_type=assignment_type,
+            submission_id=submission_id,
+            perceptual_hash=perceptual_hash,
+            near_duplicates=near_duplicates,
+            reused_from=reused_from
+        )
+
+    def __repr__(self) -> str:
+        return (f"GradingResult(grade={self.grade!r}, overall_score={self.overall_score!r}, "
+                f"assignment_type={self.assignment_type!r}, submission_id={self.submission_id!r})")
@@ -15,6 +15,9 @@ Features:
 - Assignment grading with multiple criteria
 - Real-time feedback generation
 - Performance analytics
+- Near-duplicate detection via perceptual hashing
+- Compact result objects with JSON and binary serialization
+- Opt-in sampled profiling of grading requests
 """
 
 import os
@@ -25,24 +28,44 @@ from tensorflow import keras
 from tensorflow.keras import layers
 import json
 import base64
+import hashlib
 from PIL import Image
 import io
 from typing import Dict, List, Tuple, Optional
 import logging
+import uuid
 from datetime import datetime
+from grading_profiler import ENV_PROFILER, GradingProfiler
+from grading_results import GradingResult, QualityMetrics
+from perceptual_hash import (PerceptualHashIndex, dhash, hash_to_hex, max_pixel_difference,
+                             submission_index, thumbnail_signature)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sampled request profiling, enabled by setting GRADING_PROFILE_DIR
+request_profiler = GradingProfiler.from_env()
+
+# Reusing grades of near-duplicate submissions is a server-side decision
+REUSE_DUPLICATE_RESULTS = os.environ.get('GRADING_REUSE_DUPLICATES', '').lower() in ('1', 'true', 'yes')
+
+
 class HandwritingGradingSystem:
     """
     Advanced AI-powered handwriting assessment and grading system
     """
     
-    def __init__(self):
+    def __init__(self, hash_index: Optional[PerceptualHashIndex] = None,
+                 reuse_duplicate_results: bool = False, reuse_max_distance: int = 2,
+                 reuse_pixel_tolerance: int = 24, profiler: Optional[GradingProfiler] = None):
         self.model = None
         self.preprocessing_pipeline = None
+        self.hash_index = hash_index if hash_index is not None else submission_index
+        self.reuse_duplicate_results = reuse_duplicate_results
+        self.reuse_max_distance = reuse_max_distance
+        self.reuse_pixel_tolerance = reuse_pixel_tolerance
+        self.profiler = profiler
         self.grading_criteria = {
             'accuracy': {'weight': 0.4, 'description': 'Correctness of answers and calculations'},
             'completeness': {'weight': 0.3, 'description': 'All required elements present'},
@@ -100,21 +123,39 @@ class HandwritingGradingSystem:
         
         return model
     
+    def decode_image_bytes(self, image_data: str) -> bytes:
+        """
+        Decode a base64 upload (optionally a data URL) into raw file bytes
+        """
+        if image_data.startswith('data:image'):
+            image_data = image_data.split(',')[1]
+        
+        return base64.b64decode(image_data)
+    
+    def decode_image(self, image_data: str) -> Image.Image:
+        """
+        Decode a base64 upload into a grayscale PIL image
+        """
+        return self.open_image(self.decode_image_bytes(image_data))
+    
+    def open_image(self, image_bytes: bytes) -> Image.Image:
+        """
+        Open raw image bytes as a grayscale PIL image
+        """
+        image = Image.open(io.BytesIO(image_bytes))
+        
+        # Convert to grayscale
+        if image.mode != 'L':
+            image = image.convert('L')
+        
+        return image
+    
     def preprocess_image(self, image_data: str) -> np.ndarray:
         """
         Preprocess uploaded image for AI analysis
         """
         try:
-            # Decode base64 image
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
-            
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Convert to grayscale
-            if image.mode != 'L':
-                image = image.convert('L')
+            image = self.decode_image(image_data)
             
             # Convert to numpy array
             img_array = np.array(image)
@@ -207,54 +248,149 @@ class HandwritingGradingSystem:
         
         return metrics
     
-    def grade_assignment(self, image_data: str, assignment_type: str = "general") -> Dict:
+    def find_near_duplicates(self, image_hash: int) -> List[Dict]:
+        """
+        Look up previously graded submissions whose pages look near-identical
+        """
+        return self.hash_index.query(image_hash)
+    
+    def get_reusable_result(self, near_duplicates: List[Dict], assignment_id: Optional[str],
+                            assignment_type: str, content_digest: str,
+                            thumbnail: bytes) -> Optional[GradingResult]:
+        """
+        Return the cached result of a confirmed duplicate graded for the same assignment
+        
+        A coarse 64-bit match is only a candidate: reuse also requires the same
+        assignment ID and type, and either identical file bytes or 32x32 thumbnails
+        that differ by at most ``reuse_pixel_tolerance`` in every pixel. Hash
+        distances alone cannot tell apart students' answers on a shared worksheet.
+        """
+        if not self.reuse_duplicate_results or not assignment_id:
+            return None
+        
+        for match in near_duplicates:
+            if match['distance'] > self.reuse_max_distance:
+                break
+            cached = self.hash_index.get_result(match['submission_id'])
+            if (cached is None or cached['assignment_id'] != assignment_id or
+                    cached['assignment_type'] != assignment_type):
+                continue
+            if (cached['content_digest'] == content_digest or
+                    max_pixel_difference(cached['thumbnail'], thumbnail) <= self.reuse_pixel_tolerance):
+                return cached['result']
+        return None
+    
+    def grade_assignment(self, image_data: str, assignment_type: str = "general",
+                         submission_id: Optional[str] = None, assignment_id: Optional[str] = None) -> Dict:
         """
         Main grading function that processes the assignment and returns comprehensive results
         """
         try:
-            logger.info("Starting assignment grading process")
-            
-            # Preprocess image
-            processed_image = self.preprocess_image(image_data)
-            
-            # Analyze handwriting quality
-            quality_metrics = self.analyze_handwriting_quality(processed_image)
-            
-            # Extract text regions
-            text_regions = self.extract_text_regions(processed_image)
-            
-            # Simulate content analysis (in real implementation, this would use OCR + NLP)
-            content_analysis = self.analyze_content(text_regions, assignment_type)
-            
-            # Calculate grades
-            grades = self.calculate_grades(quality_metrics, content_analysis)
-            
-            # Generate feedback
-            feedback = self.generate_feedback(grades, quality_metrics, content_analysis)
-            
-            # Prepare results
-            results = {
-                'overall_score': grades['overall_score'],
-                'accuracy': grades['accuracy'],
-                'completeness': grades['completeness'],
-                'legibility': grades['legibility'],
-                'presentation': grades['presentation'],
-                'grade': grades['letter_grade'],
-                'feedback': feedback['positive'],
-                'suggestions': feedback['improvements'],
-                'time_spent': self.estimate_grading_time(len(text_regions)),
-                'quality_metrics': quality_metrics,
-                'processing_timestamp': datetime.now().isoformat(),
-                'assignment_type': assignment_type
-            }
-            
-            logger.info(f"Grading completed successfully. Overall score: {grades['overall_score']}%")
-            return results
+            if self.profiler is not None and self.profiler.should_sample():
+                with self.profiler.profile('grade_assignment', {'assignment_type': assignment_type}):
+                    return self.evaluate_assignment(image_data, assignment_type, submission_id, assignment_id).to_dict()
+            return self.evaluate_assignment(image_data, assignment_type, submission_id, assignment_id).to_dict()
             
         except Exception as e:
             logger.error(f"Error during grading: {e}")
             return self.generate_error_response(str(e))
     
+    def evaluate_assignment(self, image_data: str, assignment_type: str = "general",
+                            submission_id: Optional[str] = None,
+                            assignment_id: Optional[str] = None) -> GradingResult:
+        """
+        Grade an assignment and return a compact result object (raises on failure)
+        """
+        logger.info("Starting assignment grading process")
+        # The index is keyed by a server-generated ID so a client-chosen
+        # submission_id can never replace another submission's entry
+        index_key = uuid.uuid4().hex
+        submission_id = submission_id or index_key
+        
+        # Decode once; hash the original page for near-duplicate search
+        try:
+            image_bytes = self.decode_image_bytes(image_data)
+            image = self.open_image(image_bytes)
+            image_hash = dhash(image)
+            processed_image = self.apply_image_preprocessing(np.array(image))
+        except Exception as e:
+            logger.error(f"Error preprocessing image: {e}")
+            raise
+        
+        # Compare against previously graded submissions
+        near_duplicates = self.find_near_duplicates(image_hash)
+        if near_duplicates:
+            logger.info(f"Submission {submission_id} has {len(near_duplicates)} near-duplicate(s)")
+        
+        content_digest = thumbnail = None
+        if self.reuse_duplicate_results:
+            content_digest = hashlib.sha256(image_bytes).hexdigest()
+            thumbnail = thumbnail_signature(image)
+        
+        cached = self.get_reusable_result(near_duplicates, assignment_id, assignment_type,
+                                          content_digest, thumbnail)
+        if cached is not None:
+            logger.info(f"Reusing grading result of near-duplicate {cached.submission_id}")
+            result = cached.replace(
+                submission_id=submission_id,
+                perceptual_hash=hash_to_hex(image_hash),
+                near_duplicates=near_duplicates,
+                reused_from=cached.submission_id,
+                processing_timestamp=datetime.now().isoformat(),
+                assignment_type=assignment_type
+            )
+            self.hash_index.add(index_key, image_hash)
+            return result
+        
+        # Analyze handwriting quality
+        quality_metrics = self.analyze_handwriting_quality(processed_image)
+        
+        # Extract text regions
+        text_regions = self.extract_text_regions(processed_image)
+        
+        # Simulate content analysis (in real implementation, this would use OCR + NLP)
+        content_analysis = self.analyze_content(text_regions, assignment_type)
+        
+        # Calculate grades
+        grades = self.calculate_grades(quality_metrics, content_analysis)
+        
+        # Generate feedback
+        feedback = self.generate_feedback(grades, quality_metrics, content_analysis)
+        
+        # Prepare results
+        result = GradingResult(
+            overall_score=grades['overall_score'],
+            accuracy=grades['accuracy'],
+            completeness=grades['completeness'],
+            legibility=grades['legibility'],
+            presentation=grades['presentation'],
+            grade=grades['letter_grade'],
+            feedback=feedback['positive'],
+            suggestions=feedback['improvements'],
+            time_spent=self.estimate_grading_time(len(text_regions)),
+            quality_metrics=QualityMetrics.from_dict(quality_metrics),
+            processing_timestamp=datetime.now().isoformat(),
+            assignment_type=assignment_type,
+            submission_id=submission_id,
+            perceptual_hash=hash_to_hex(image_hash),
+            near_duplicates=near_duplicates
+        )
+        
+        # Results are only retained when they may be reused
+        cache_record = None
+        if self.reuse_duplicate_results and assignment_id:
+            cache_record = {
+                'result': result,
+                'assignment_id': assignment_id,
+                'assignment_type': assignment_type,
+                'content_digest': content_digest,
+                'thumbnail': thumbnail
+            }
+        self.hash_index.add(index_key, image_hash, cache_record)
+        
+        logger.info(f"Grading completed successfully. Overall score: {grades['overall_score']}%")
+        return result
+    
     def analyze_content(self, text_regions: List[np.ndarray], assignment_type: str) -> Dict:
         """
         Analyze content of the assignment (simulated)
@@ -384,26 +520,53 @@ class HandwritingGradingSystem:
             'suggestions': ['Please try uploading a clearer image', 'Ensure the file format is supported']
         }
 
+def redact_duplicate_details(results: Dict) -> Dict:
+    """
+    Replace other submissions' IDs with counts before a result leaves the server
+    """
+    near_duplicates = results.pop('near_duplicates', None)
+    if near_duplicates is not None:
+        results['near_duplicate_count'] = len(near_duplicates)
+    if results.pop('reused_from', None) is not None:
+        results['reused_duplicate_result'] = True
+    return results
+
 # API Endpoint Handler
-def handle_grading_request(request_data: Dict) -> Dict:
+def handle_grading_request(request_data: Dict, profiler: Optional[GradingProfiler] = ENV_PROFILER) -> Dict:
     """
     Handle incoming grading requests from the frontend
+    
+    ``profiler`` defaults to the GRADING_PROFILE_* configuration; pass None to disable profiling.
+    """
+    if profiler is ENV_PROFILER:
+        profiler = request_profiler
+    if profiler is not None and profiler.should_sample():
+        metadata = {'assignment_type': request_data.get('assignment_type', 'general')}
+        with profiler.profile('handle_grading_request', metadata):
+            return _process_grading_request(request_data)
+    return _process_grading_request(request_data)
+
+def _process_grading_request(request_data: Dict) -> Dict:
+    """
+    Validate a grading request and run it through the grading system
     """
     try:
         # Initialize grading system
-        grading_system = HandwritingGradingSystem()
+        grading_system = HandwritingGradingSystem(reuse_duplicate_results=REUSE_DUPLICATE_RESULTS)
         
         # Extract request data
         image_data = request_data.get('image_data')
         assignment_type = request_data.get('assignment_type', 'general')
+        submission_id = request_data.get('submission_id')
+        assignment_id = request_data.get('assignment_id')
         
         if not image_data:
             return {'error': True, 'message': 'No image data provided'}
         
         # Process the assignment
-        results = grading_system.grade_assignment(image_data, assignment_type)
+        results = grading_system.grade_assignment(image_data, assignment_type, submission_id, assignment_id)
         
-        return results
+        return redact_duplicate_details(results)
         
     except Exception as e:
         logger.error(f"API Error: {e}")
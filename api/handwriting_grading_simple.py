@@ -8,15 +8,20 @@ import json
 import base64
 from PIL import Image
 import io
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
 from datetime import datetime
 import random
+from grading_profiler import ENV_PROFILER, GradingProfiler
+from grading_results import GradingResult, QualityMetrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sampled request profiling, enabled by setting GRADING_PROFILE_DIR
+request_profiler = GradingProfiler.from_env()
+
 class SimpleHandwritingGradingSystem:
     """
     Simplified AI-powered handwriting assessment and grading system
@@ -104,46 +109,52 @@ class SimpleHandwritingGradingSystem:
         Main grading function that processes the assignment and returns comprehensive results
         """
         try:
-            logger.info("Starting assignment grading process")
-            
-            # Preprocess image
-            image_info = self.preprocess_image(image_data)
-            
-            # Analyze handwriting quality
-            quality_metrics = self.analyze_handwriting_quality(image_info)
-            
-            # Simulate content analysis based on assignment type
-            content_analysis = self.analyze_content(assignment_type)
-            
-            # Calculate grades
-            grades = self.calculate_grades(quality_metrics, content_analysis)
-            
-            # Generate feedback
-            feedback = self.generate_feedback(grades, quality_metrics, content_analysis)
-            
-            # Prepare results
-            results = {
-                'overall_score': grades['overall_score'],
-                'accuracy': grades['accuracy'],
-                'completeness': grades['completeness'],
-                'legibility': grades['legibility'],
-                'presentation': grades['presentation'],
-                'grade': grades['letter_grade'],
-                'feedback': feedback['positive'],
-                'suggestions': feedback['improvements'],
-                'time_spent': self.estimate_grading_time(),
-                'quality_metrics': quality_metrics,
-                'processing_timestamp': datetime.now().isoformat(),
-                'assignment_type': assignment_type
-            }
-            
-            logger.info(f"Grading completed successfully. Overall score: {grades['overall_score']}%")
-            return results
+            return self.evaluate_assignment(image_data, assignment_type).to_dict()
             
         except Exception as e:
             logger.error(f"Error during grading: {e}")
             return self.generate_error_response(str(e))
     
+    def evaluate_assignment(self, image_data: str, assignment_type: str = "general") -> GradingResult:
+        """
+        Grade an assignment and return a compact result object (raises on failure)
+        """
+        logger.info("Starting assignment grading process")
+        
+        # Preprocess image
+        image_info = self.preprocess_image(image_data)
+        
+        # Analyze handwriting quality
+        quality_metrics = self.analyze_handwriting_quality(image_info)
+        
+        # Simulate content analysis based on assignment type
+        content_analysis = self.analyze_content(assignment_type)
+        
+        # Calculate grades
+        grades = self.calculate_grades(quality_metrics, content_analysis)
+        
+        # Generate feedback
+        feedback = self.generate_feedback(grades, quality_metrics, content_analysis)
+        
+        # Prepare results
+        result = GradingResult(
+            overall_score=grades['overall_score'],
+            accuracy=grades['accuracy'],
+            completeness=grades['completeness'],
+            legibility=grades['legibility'],
+            presentation=grades['presentation'],
+            grade=grades['letter_grade'],
+            feedback=feedback['positive'],
+            suggestions=feedback['improvements'],
+            time_spent=self.estimate_grading_time(),
+            quality_metrics=QualityMetrics.from_dict(quality_metrics),
+            processing_timestamp=datetime.now().isoformat(),
+            assignment_type=assignment_type
+        )
+        
+        logger.info(f"Grading completed successfully. Overall score: {grades['overall_score']}%")
+        return result
+    
     def analyze_content(self, assignment_type: str) -> Dict:
         """
         Simulate content analysis based on assignment type
@@ -275,9 +286,23 @@ class SimpleHandwritingGradingSystem:
         }
 
 # API Endpoint Handler
-def handle_grading_request(request_data: Dict) -> Dict:
+def handle_grading_request(request_data: Dict, profiler: Optional[GradingProfiler] = ENV_PROFILER) -> Dict:
     """
     Handle incoming grading requests from the frontend
+    
+    ``profiler`` defaults to the GRADING_PROFILE_* configuration; pass None to disable profiling.
+    """
+    if profiler is ENV_PROFILER:
+        profiler = request_profiler
+    if profiler is not None and profiler.should_sample():
+        metadata = {'assignment_type': request_data.get('assignment_type', 'general')}
+        with profiler.profile('handle_grading_request', metadata):
+            return _process_grading_request(request_data)
+    return _process_grading_request(request_data)
+
+def _process_grading_request(request_data: Dict) -> Dict:
+    """
+    Validate a grading request and run it through the grading system
     """
     try:
         # Initialize grading system
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+Grading API Load Test
+Replays synthetic handwriting uploads against the grading API
+
+Features:
+- Unique synthetic page per request (or a fixed pool) generated with Pillow,
+  rendered ahead of the run by worker processes
+- Closed-loop (fixed concurrency) or open-loop (Poisson arrival rate) load
+- Throughput, latency percentiles and error breakdown
+- Reports when the client could not render pages fast enough
+- Server memory sampled over time from /api/stats
+- Optionally spawns the local stand-in server for either backend
+
+Usage:
+    python load_test.py --backend simple --concurrency 8 --duration 30
+    python load_test.py --url http://localhost:5000 --rate 20 --duration 60
+"""
+
+import argparse
+import base64
+import http.client
+import io
+import json
+import os
+import queue
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from PIL import Image, ImageDraw
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ASSIGNMENT_TYPES = ['mathematics', 'essay', 'general']
+
+
+def generate_synthetic_upload(seed: int, width: int = 800, height: int = 600) -> str:
+    """
+    Draw a fake handwritten page and return it as a base64 PNG data URL
+    """
+    rng = random.Random(seed)
+    image = Image.new('L', (width, height), color=rng.randint(220, 255))
+    draw = ImageDraw.Draw(image)
+
+    line_height = rng.randint(28, 40)
+    for baseline in range(line_height, height - line_height, line_height):
+        x = rng.randint(20, 60)
+        while x < width - 60:
+            # A "word" is a short wobbly polyline
+            points = [(x, baseline)]
+            for _ in range(rng.randint(3, 8)):
+                x += rng.randint(4, 12)
+                points.append((x, baseline - rng.randint(0, line_height // 2)))
+            draw.line(points, fill=rng.randint(0, 80), width=rng.randint(1, 3))
+            x += rng.randint(12, 30)
+
+    buffer = io.BytesIO()
+    # Fast compression: encoding dominates the cost of a page
+    image.save(buffer, format='PNG', compress_level=1)
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+class UploadSource:
+    """
+    Supplies synthetic uploads: a fresh page per request, or a fixed cycling pool
+
+    Fresh pages keep near-duplicate detection from matching every request against
+    earlier ones. Worker processes render them into a bounded buffer ahead of the
+    load workers; every get() that finds the buffer empty is counted as starved.
+    """
+
+    def __init__(self, pool_size: int = 0, prefetch: int = 256, render_processes: int = 1,
+                 pages: Optional[List[str]] = None):
+        if pages is not None:
+            self.pool = list(pages)
+        else:
+            self.pool = [generate_synthetic_upload(seed) for seed in range(pool_size)]
+        self.prefetch = prefetch
+        self.starved_requests = 0
+        self.starved_seconds = 0.0
+        self._stats_lock = threading.Lock()
+        self._queue: 'queue.Queue[str]' = queue.Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self._executor = None
+        self._producer = None
+        if not self.pool:
+            self._executor = ProcessPoolExecutor(max_workers=render_processes)
+            self._producer = threading.Thread(target=self._produce, args=(render_processes * 4,),
+                                              name="upload-producer", daemon=True)
+            self._producer.start()
+
+    def _produce(self, window: int):
+        # Random base so repeated runs against a long-lived server stay unique
+        seed = random.getrandbits(32)
+        pending = deque()
+        while not self._stop.is_set():
+            # Keep every render process busy while the oldest page is handed over
+            while len(pending) < window:
+                pending.append(self._executor.submit(generate_synthetic_upload, seed))
+                seed += 1
+            page = pending.popleft().result()
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(page, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until the prefetch buffer is full, so the run starts with pages in hand"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self._producer is not None and self._queue.qsize() < self.prefetch:
+            if not self._producer.is_alive() or (deadline is not None and time.perf_counter() >= deadline):
+                return False
+            time.sleep(0.05)
+        return True
+
+    def get(self, request_number: int) -> str:
+        if self.pool:
+            return self.pool[request_number % len(self.pool)]
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+        # Starved: the workers are outpacing the renderers
+        start = time.perf_counter()
+        while True:
+            try:
+                page = self._queue.get(timeout=1.0)
+                break
+            except queue.Empty:
+                if not self._producer.is_alive():
+                    raise RuntimeError("Upload producer stopped")
+        with self._stats_lock:
+            self.starved_requests += 1
+            self.starved_seconds += time.perf_counter() - start
+        return page
+
+    def starvation(self) -> Tuple[int, float]:
+        """(requests that waited for a page, total seconds spent waiting) so far"""
+        with self._stats_lock:
+            return self.starved_requests, self.starved_seconds
+
+    def close(self):
+        self._stop.set()
+        if self._producer is not None:
+            self._producer.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * p), len(sorted_values) - 1)]
+
+
+class LoadTestResults:
+    """
+    Thread-safe collection of request outcomes
+    """
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.memory_samples: List[Dict] = []
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, status: str):
+        with self._lock:
+            self.latencies.append(latency)
+            self.statuses[status] += 1
+
+    def summary(self) -> Dict:
+        with self._lock:
+            elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+            latencies = sorted(self.latencies)
+            total = len(latencies)
+            errors = total - self.statuses.get('200', 0)
+            return {
+                'requests': total,
+                'duration_seconds': round(elapsed, 2),
+                'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+                'error_rate': round(errors / total, 4) if total else 0.0,
+                'statuses': dict(self.statuses),
+                'latency_ms': {
+                    'mean': round(sum(latencies) / total * 1000, 2) if total else 0.0,
+                    'p50': round(percentile(latencies, 0.50) * 1000, 2),
+                    'p90': round(percentile(latencies, 0.90) * 1000, 2),
+                    'p95': round(percentile(latencies, 0.95) * 1000, 2),
+                    'p99': round(percentile(latencies, 0.99) * 1000, 2),
+                    'max': round(latencies[-1] * 1000, 2) if total else 0.0
+                },
+                'memory_over_time': list(self.memory_samples)
+            }
+
+
+class LoadGenerator:
+    """
+    Sends synthetic grading requests at a fixed concurrency or arrival rate
+    """
+
+    def __init__(self, base_url: str, uploads: UploadSource, endpoint: str = '/api/grade',
+                 concurrency: int = 4, rate: Optional[float] = None,
+                 duration: Optional[float] = None, total_requests: Optional[int] = None,
+                 timeout: float = 60.0, stats_interval: float = 1.0):
+        if duration is None and total_requests is None:
+            raise ValueError("Either duration or total_requests is required")
+
+        self.base_url = base_url.rstrip('/')
+        self.uploads = uploads
+        self.endpoint = endpoint
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.total_requests = total_requests
+        self.timeout = timeout
+        self.stats_interval = stats_interval
+        self.results = LoadTestResults()
+        self._issued = 0
+        self._issue_lock = threading.Lock()
+        self._next_arrival = 0.0
+        self._stop = threading.Event()
+        self._run_id = uuid.uuid4().hex[:8]
+
+    def _next_slot(self) -> Optional[Tuple[int, float]]:
+        """
+        Claim the next request and return (request number, scheduled start) or None when done
+
+        The scheduled start is None in closed-loop mode, where a request starts once its body is built.
+        """
+        with self._issue_lock:
+            now = time.perf_counter()
+            if self.total_requests is not None and self._issued >= self.total_requests:
+                return None
+            if self.duration is not None and now - self.results.started_at >= self.duration:
+                return None
+            request_number = self._issued
+            self._issued += 1
+
+            if self.rate is None:
+                return request_number, None
+            # Open loop: Poisson arrivals independent of response times
+            self._next_arrival = max(self._next_arrival, self.results.started_at)
+            self._next_arrival += random.expovariate(self.rate)
+            if self.duration is not None and self._next_arrival - self.results.started_at >= self.duration:
+                return None
+            return request_number, self._next_arrival
+
+    def _build_payload(self, request_number: int) -> bytes:
+        if self.endpoint == '/api/feedback':
+            payload = {name: round(random.uniform(50, 100), 1)
+                       for name in ('accuracy', 'completeness', 'legibility', 'presentation')}
+        else:
+            payload = {
+                'image_data': self.uploads.get(request_number),
+                'assignment_type': random.choice(ASSIGNMENT_TYPES),
+                'student_id': f"load-student-{request_number}",
+                'assignment_id': 'load-test',
+                'submission_id': f"load-{self._run_id}-{request_number}"
+            }
+        return json.dumps(payload).encode('utf-8')
+
+    def _send(self, body: bytes) -> str:
+        request = urllib.request.Request(
+            self.base_url + self.endpoint, data=body,
+            headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return str(response.status)
+        except urllib.error.HTTPError as e:
+            e.read()
+            return str(e.code)
+        except (http.client.HTTPException, OSError) as e:
+            # URLError, timeouts, resets, IncompleteRead, BadStatusLine... all count as errors
+            reason = getattr(e, 'reason', e)
+            return type(reason).__name__
+
+    def _worker(self):
+        while not self._stop.is_set():
+            slot = self._next_slot()
+            if slot is None:
+                return
+            request_number, scheduled = slot
+            # Build the payload while waiting for the scheduled start
+            body = self._build_payload(request_number)
+            if scheduled is None:
+                # Closed loop: time the server, not waiting for a page or encoding JSON
+                scheduled = time.perf_counter()
+            else:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            status = self._send(body)
+            # Open loop: measured from the scheduled start so queueing delay is not hidden
+            self.results.record(time.perf_counter() - scheduled, status)
+
+    def _monitor(self):
+        while not self._stop.wait(self.stats_interval):
+            self.sample_server_stats()
+
+    def sample_server_stats(self):
+        """Record server memory and request counters from /api/stats"""
+        try:
+            with urllib.request.urlopen(self.base_url + '/api/stats', timeout=5) as response:
+                stats = json.loads(response.read())
+        except (http.client.HTTPException, OSError, ValueError):
+            return
+        with self.results._lock:
+            self.results.memory_samples.append({
+                'elapsed_seconds': round(time.perf_counter() - self.results.started_at, 2),
+                'rss_mb': stats.get('memory', {}).get('rss_mb'),
+                'completed_requests': len(self.results.latencies),
+                'server_threads': stats.get('active_threads')
+            })
+
+    def run(self) -> Dict:
+        """
+        Run the load test to completion and return the summary
+        """
+        self.results = LoadTestResults()
+        self._issued = 0
+        self._next_arrival = 0.0
+        self._stop.clear()
+        starved_before, waited_before = self.uploads.starvation()
+
+        monitor = threading.Thread(target=self._monitor, name="load-monitor", daemon=True)
+        monitor.start()
+        workers = [threading.Thread(target=self._worker, name=f"load-worker-{i}", daemon=True)
+                   for i in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            logger.info("Interrupted, waiting for in-flight requests")
+            self._stop.set()
+            for worker in workers:
+                worker.join()
+
+        self.results.finished_at = time.perf_counter()
+        self._stop.set()
+        monitor.join()
+        self.sample_server_stats()
+
+        summary = self.results.summary()
+        starved, waited = self.uploads.starvation()
+        summary['upload_starvation'] = {
+            'starved_requests': starved - starved_before,
+            'wait_seconds': round(waited - waited_before, 3)
+        }
+        return summary
+
+
+def find_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def spawn_local_server(backend: str, port: int, startup_timeout: float = 120.0) -> subprocess.Popen:
+    """
+    Start local_server.py in a subprocess and wait until /health responds
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'local_server.py')
+    process = subprocess.Popen([sys.executable, script, '--backend', backend, '--port', str(port)])
+
+    deadline = time.time() + startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Local server exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return process
+        except (http.client.HTTPException, OSError):
+            time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError("Local server did not become healthy in time")
+
+
+def format_summary(summary: Dict) -> str:
+    latency = summary['latency_ms']
+    lines = [
+        f"Requests:    {summary['requests']} in {summary['duration_seconds']}s",
+        f"Throughput:  {summary['throughput_rps']} req/s",
+        f"Error rate:  {summary['error_rate'] * 100:.2f}%  {summary['statuses']}",
+        f"Latency ms:  mean={latency['mean']} p50={latency['p50']} p90={latency['p90']} "
+        f"p95={latency['p95']} p99={latency['p99']} max={latency['max']}",
+        "Memory:"
+    ]
+    for sample in summary['memory_over_time']:
+        lines.append(f"  t={sample['elapsed_seconds']:>7}s  rss={sample['rss_mb']} MB  "
+                     f"completed={sample['completed_requests']}")
+    starvation = summary.get('upload_starvation', {})
+    if starvation.get('starved_requests'):
+        lines.append(f"WARNING: {starvation['starved_requests']} requests waited "
+                     f"{starvation['wait_seconds']}s in total for a synthetic page; throughput is "
+                     f"client-bound (raise --render-processes or --prefetch, or use --image-pool)")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load test the grading API with synthetic uploads")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help="Base URL of a running server")
+    target.add_argument('--backend', choices=['simple', 'advanced'], help="Spawn the local stand-in server")
+    parser.add_argument('--endpoint', choices=['/api/grade', '/api/analyze', '/api/feedback'], default='/api/grade')
+    parser.add_argument('--concurrency', type=int, default=4, help="Concurrent workers (max in flight)")
+    parser.add_argument('--rate', type=float, help="Open-loop arrival rate in req/s (default: closed loop)")
+    parser.add_argument('--duration', type=float, help="Run for this many seconds")
+    parser.add_argument('--requests', type=int, help="Stop after this many requests")
+    parser.add_argument('--image-pool', type=int, default=0,
+                        help="Cycle through this many pages instead of a fresh page per request "
+                             "(faster client, but repeats trigger near-duplicate matches)")
+    parser.add_argument('--render-processes', type=int, default=min(4, os.cpu_count() or 1),
+                        help="Processes rendering fresh pages")
+    parser.add_argument('--prefetch', type=int, default=256, help="Fresh pages rendered before the run starts")
+    parser.add_argument('--stats-interval', type=float, default=1.0, help="Seconds between /api/stats samples")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--json', dest='json_output', help="Also write the summary as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.duration is None and args.requests is None:
+        args.duration = 30.0
+
+    uploads = UploadSource(args.image_pool, prefetch=max(args.prefetch, args.concurrency * 2),
+                           render_processes=args.render_processes)
+    if not uploads.pool:
+        logger.info(f"Rendering {uploads.prefetch} pages ahead of the run")
+        uploads.wait_until_ready()
+
+    server = None
+    base_url = args.url
+    if args.backend:
+        port = find_free_port()
+        server = spawn_local_server(args.backend, port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        mode = f"open loop at {args.rate} req/s" if args.rate else "closed loop"
+        logger.info(f"Load testing {base_url}{args.endpoint}: {mode}, concurrency {args.concurrency}")
+        generator = LoadGenerator(
+            base_url, uploads, endpoint=args.endpoint, concurrency=args.concurrency,
+            rate=args.rate, duration=args.duration, total_requests=args.requests,
+            timeout=args.timeout, stats_interval=args.stats_interval
+        )
+        summary = generator.run()
+    finally:
+        uploads.close()
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(format_summary(summary))
+    if args.json_output:
+        with open(args.json_output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+# Example usage
+if __name__ == "__main__":
+    main()
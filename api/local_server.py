@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Local Stand-in API Server
+Minimal standard-library HTTP server around the grading backends
+
+Serves the endpoints documented in the README for local testing and load
+tests; not intended for production (use the Flask app there).
+
+Endpoints:
+- GET  /health
+- POST /api/grade
+- POST /api/analyze
+- POST /api/feedback
+- GET  /api/stats
+
+Usage:
+    python local_server.py --backend simple --port 5000
+"""
+
+import argparse
+import base64
+import binascii
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+import logging
+from grading_results import QualityMetrics
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "AI Handwriting Grading System"
+SERVICE_VERSION = "1.0.0"
+MAX_FILE_SIZE = int(os.environ.get('MAX_FILE_SIZE', 10 * 1024 * 1024))
+
+BACKENDS = {
+    'simple': ('handwriting_grading_simple', 'SimpleHandwritingGradingSystem'),
+    'advanced': ('handwriting_grading', 'HandwritingGradingSystem')
+}
+
+
+def get_memory_usage() -> Dict[str, float]:
+    """
+    Current and peak resident memory of this process in MB
+    """
+    usage = {'rss_mb': 0.0, 'peak_rss_mb': 0.0}
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes on Linux
+        usage['peak_rss_mb'] = round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 2)
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        usage['rss_mb'] = round(resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 2)
+    except (OSError, ValueError, AttributeError):
+        usage['rss_mb'] = usage['peak_rss_mb']
+    return usage
+
+
+def validate_image_data(image_data) -> None:
+    """
+    Raise ValueError unless image_data is a non-empty base64 string (or data URL)
+    """
+    if not image_data or not isinstance(image_data, str):
+        raise ValueError("No image data provided")
+    if image_data.startswith('data:image'):
+        image_data = image_data.split(',', 1)[-1]
+    try:
+        base64.b64decode(image_data, validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid base64 image data: {e}")
+
+
+class ServerStats:
+    """
+    Thread-safe request counters for the /api/stats endpoint
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.endpoints: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, path: str, latency: float, error: bool):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.total_latency += latency
+            self.endpoints[path] = self.endpoints.get(path, 0) + 1
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'requests': self.requests,
+                'errors': self.errors,
+                'mean_latency_ms': round(self.total_latency / self.requests * 1000, 2) if self.requests else 0.0,
+                'endpoints': dict(self.endpoints)
+            }
+
+
+class GradingRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes HTTP requests to the configured grading backend
+    """
+
+    server_version = "GradingStandIn/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        self._dispatch({
+            '/health': self.handle_health,
+            '/api/stats': self.handle_stats
+        }, with_body=False)
+
+    def do_POST(self):
+        self._dispatch({
+            '/api/grade': self.handle_grade,
+            '/api/analyze': self.handle_analyze,
+            '/api/feedback': self.handle_feedback
+        }, with_body=True)
+
+    def _dispatch(self, routes: Dict, with_body: bool):
+        start = time.perf_counter()
+        path = self.path.split('?', 1)[0]
+        handler = routes.get(path)
+
+        try:
+            # Always consume the body so the keep-alive connection stays usable
+            data = self._read_json() if with_body else None
+            if handler is None:
+                status, payload = 404, {'error': True, 'message': f"Unknown endpoint: {path}"}
+            elif with_body:
+                status, payload = handler(data)
+            else:
+                status, payload = handler()
+        except ValueError as e:
+            status, payload = 400, {'error': True, 'message': str(e)}
+        except Exception as e:
+            logger.error(f"API Error: {e}")
+            status, payload = 500, {'error': True, 'message': str(e)}
+
+        self._send_json(status, payload)
+        self.server.stats.record(path, time.perf_counter() - start, status >= 400)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_FILE_SIZE:
+            self.rfile.read(length)
+            raise ValueError("Request body exceeds MAX_FILE_SIZE")
+        try:
+            data = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON body: {e}")
+        if not isinstance(data, dict):
+            raise ValueError("JSON body must be an object")
+        return data
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_health(self) -> Tuple[int, Dict]:
+        return 200, {
+            'status': 'healthy',
+            'timestamp': datetime.now().isoformat(),
+            'service': SERVICE_NAME,
+            'version': SERVICE_VERSION,
+            'backend': self.server.backend_name
+        }
+
+    def handle_grade(self, data: Dict) -> Tuple[int, Dict]:
+        # Reject bad uploads here so backend errors can be reported as 500s
+        validate_image_data(data.get('image_data'))
+        results = self.server.backend.handle_grading_request(data)
+        results['student_id'] = data.get('student_id')
+        results['assignment_id'] = data.get('assignment_id')
+        results['api_timestamp'] = datetime.now().isoformat()
+        return (500 if results.get('error') else 200), results
+
+    def handle_analyze(self, data: Dict) -> Tuple[int, Dict]:
+        image_data = data.get('image_data')
+        validate_image_data(image_data)
+        system = self.server.grading_system
+        processed = system.preprocess_image(image_data)
+        return 200, {
+            # QualityMetrics unwraps the NumPy scalars the advanced backend returns
+            'quality_metrics': QualityMetrics.from_dict(system.analyze_handwriting_quality(processed)).to_dict(),
+            'analysis_timestamp': datetime.now().isoformat()
+        }
+
+    def handle_feedback(self, data: Dict) -> Tuple[int, Dict]:
+        try:
+            grades = {name: float(data[name]) for name in ('accuracy', 'completeness', 'legibility', 'presentation')}
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Missing or invalid score: {e}")
+        feedback = self.server.grading_system.generate_feedback(grades, {}, {})
+        return 200, {
+            'feedback': feedback['positive'],
+            'suggestions': feedback['improvements'],
+            'assignment_type': data.get('assignment_type', 'general')
+        }
+
+    def handle_stats(self) -> Tuple[int, Dict]:
+        return 200, {
+            'backend': self.server.backend_name,
+            'server': self.server.stats.to_dict(),
+            'memory': get_memory_usage(),
+            'active_threads': threading.active_count(),
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+class GradingServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server bound to one grading backend
+    """
+
+    daemon_threads = True
+    # The default backlog of 5 drops connections under load (1s SYN retries skew latency)
+    request_queue_size = 128
+
+    def __init__(self, address: Tuple[str, int], backend_name: str = 'simple'):
+        if backend_name not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend_name}")
+        module_name, class_name = BACKENDS[backend_name]
+
+        self.backend_name = backend_name
+        self.backend = importlib.import_module(module_name)
+        # Shared instance for /api/analyze and /api/feedback
+        self.grading_system = getattr(self.backend, class_name)()
+        self.stats = ServerStats()
+        super().__init__(address, GradingRequestHandler)
+
+
+def run_server(host: str = '127.0.0.1', port: int = 5000, backend_name: str = 'simple'):
+    """
+    Serve until interrupted
+    """
+    server = GradingServer((host, port), backend_name)
+    logger.info(f"Serving {backend_name} backend on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in server for the grading API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='simple')
+    args = parser.parse_args(argv)
+    run_server(args.host, args.port, args.backend)
+
+
+# Example usage
+if __name__ == "__main__":
+    main()
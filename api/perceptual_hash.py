@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Perceptual Hashing & Near-Duplicate Detection
+Flags copied or re-photographed submissions before they are graded
+
+Features:
+- 64-bit difference hash (dHash) computed with Pillow only
+- In-memory multi-index hash table for Hamming-distance search
+- Sub-millisecond top-k lookups for hundreds of thousands of pages
+- Bounded size with least-recently-used eviction
+- Optional caching of grading results for near-duplicate reuse
+- Small grayscale thumbnails for pixel-level confirmation of a match
+"""
+
+import threading
+from collections import OrderedDict
+from PIL import Image
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+HASH_BITS = 64
+HASH_SIZE = 8  # 8x8 gradient grid -> 64 bits
+THUMBNAIL_SIZE = 32
+
+
+def dhash(image: Image.Image, hash_size: int = HASH_SIZE) -> int:
+    """
+    Compute a difference hash of an image as an integer
+
+    The image is shrunk to (hash_size + 1) x hash_size grayscale pixels and each
+    bit records whether a pixel is brighter than its right-hand neighbour, so the
+    hash survives rescaling, recompression and small lighting changes.
+    """
+    if image.mode != 'L':
+        image = image.convert('L')
+    pixels = image.resize((hash_size + 1, hash_size), Image.BILINEAR).tobytes()
+
+    value = 0
+    row_width = hash_size + 1
+    for row in range(hash_size):
+        offset = row * row_width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count('1')
+
+
+def hash_to_hex(value: int) -> str:
+    """Render a 64-bit hash as a fixed-width hex string"""
+    return f"{value:016x}"
+
+
+def thumbnail_signature(image: Image.Image, size: int = THUMBNAIL_SIZE) -> bytes:
+    """
+    Shrink an image to size x size grayscale pixels (box-averaged) and return the raw bytes
+    """
+    if image.mode != 'L':
+        image = image.convert('L')
+    return image.resize((size, size), Image.BOX).tobytes()
+
+
+def max_pixel_difference(a: bytes, b: bytes) -> int:
+    """
+    Largest absolute per-pixel difference between two thumbnail signatures
+
+    Unlike a hash distance, a single region that changed (say, one answer box
+    filled in differently on a shared worksheet) dominates the result.
+    """
+    if len(a) != len(b):
+        raise ValueError("Thumbnail signatures must have the same size")
+    return max(abs(x - y) for x, y in zip(a, b))
+
+
+class PerceptualHashIndex:
+    """
+    Bounded multi-index hash table for near-duplicate search by Hamming distance
+
+    Each 64-bit hash is split into ``num_bands`` disjoint bands and every band is
+    indexed in its own exact-match table. By the pigeonhole principle two hashes
+    within ``max_distance`` bits differ by at most ``max_distance // num_bands``
+    bits on at least one band, so a query only probes those few band values and
+    verifies the hashes found there instead of scanning the whole index.
+    Around ``64 / log2(expected_size)`` bands keeps the buckets nearly empty.
+
+    Submissions with identical hashes share one table entry, so a query's cost
+    depends on the number of distinct nearby hashes rather than on how many
+    copies were submitted. Entries and cached results are evicted least recently
+    used first once ``max_entries`` / ``max_cached_results`` is reached.
+    """
+
+    def __init__(self, max_distance: int = 5, num_bands: int = 3,
+                 max_entries: int = 500_000, max_cached_results: int = 10_000):
+        if not 0 <= max_distance < HASH_BITS:
+            raise ValueError(f"max_distance must be in [0, {HASH_BITS - 1}]")
+        if not 1 <= num_bands <= HASH_BITS:
+            raise ValueError(f"num_bands must be in [1, {HASH_BITS}]")
+        if max_entries < 1 or max_cached_results < 0:
+            raise ValueError("max_entries must be positive and max_cached_results non-negative")
+
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.max_cached_results = max_cached_results
+        self._bands = self._build_bands(num_bands)
+        # band value -> distinct hashes having that band value
+        self._tables: List[Dict[int, Set[int]]] = [{} for _ in self._bands]
+        # hash -> submission keys with exactly that hash, in insertion order
+        self._groups: Dict[int, Dict[Hashable, None]] = {}
+        # submission key -> hash, least recently added first
+        self._entries: 'OrderedDict[Hashable, int]' = OrderedDict()
+        self._results: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build_bands(num_bands: int) -> List[Tuple[int, int]]:
+        """Split the hash bits into (shift, mask) pairs of near-equal width"""
+        base, extra = divmod(HASH_BITS, num_bands)
+        bands = []
+        shift = 0
+        for i in range(num_bands):
+            width = base + (1 if i < extra else 0)
+            bands.append((shift, (1 << width) - 1))
+            shift += width
+        return bands
+
+    @staticmethod
+    def _band_neighbours(value: int, mask: int, radius: int) -> List[int]:
+        """All band values within ``radius`` flipped bits of ``value``"""
+        neighbours = [value]
+        frontier = [(value, 0)]
+        width = mask.bit_length()
+        for _ in range(radius):
+            next_frontier = []
+            for current, lowest in frontier:
+                for bit in range(lowest, width):
+                    flipped = current ^ (1 << bit)
+                    neighbours.append(flipped)
+                    next_frontier.append((flipped, bit + 1))
+            frontier = next_frontier
+        return neighbours
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: Hashable, image_hash: int, result: Any = None):
+        """
+        Register a submission hash, replacing any previous entry for the key
+
+        ``result`` is cached for reuse only when given.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+
+            self._entries[key] = image_hash
+            group = self._groups.get(image_hash)
+            if group is None:
+                group = self._groups[image_hash] = {}
+                for table, (shift, mask) in zip(self._tables, self._bands):
+                    table.setdefault((image_hash >> shift) & mask, set()).add(image_hash)
+            group[key] = None
+
+            if result is not None and self.max_cached_results:
+                self._results[key] = result
+                while len(self._results) > self.max_cached_results:
+                    self._results.popitem(last=False)
+
+            while len(self._entries) > self.max_entries:
+                self._remove_locked(next(iter(self._entries)))
+
+    def _remove_locked(self, key: Hashable):
+        """Drop a key and its cached result (caller holds the lock)"""
+        image_hash = self._entries.pop(key)
+        self._results.pop(key, None)
+
+        group = self._groups[image_hash]
+        del group[key]
+        if group:
+            return
+        del self._groups[image_hash]
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            band_value = (image_hash >> shift) & mask
+            bucket = table[band_value]
+            bucket.discard(image_hash)
+            if not bucket:
+                del table[band_value]
+
+    def query(self, image_hash: int, max_distance: Optional[int] = None,
+              exclude: Optional[Hashable] = None, limit: Optional[int] = 10) -> List[Dict]:
+        """
+        Find up to ``limit`` indexed submissions within ``max_distance`` bits, nearest first
+
+        ``limit=None`` returns every match.
+        """
+        if max_distance is None:
+            max_distance = self.max_distance
+        max_distance = min(max_distance, self.max_distance)
+
+        band_radius = max_distance // len(self._bands)
+
+        with self._lock:
+            candidates = set()
+            for table, (shift, mask) in zip(self._tables, self._bands):
+                for band_value in self._band_neighbours((image_hash >> shift) & mask, mask, band_radius):
+                    bucket = table.get(band_value)
+                    if bucket:
+                        candidates.update(bucket)
+
+            nearby = []
+            for candidate in candidates:
+                distance = hamming_distance(image_hash, candidate)
+                if distance <= max_distance:
+                    nearby.append((distance, candidate))
+            nearby.sort()
+
+            matches = []
+            for distance, candidate in nearby:
+                for key in self._groups[candidate]:
+                    if key == exclude:
+                        continue
+                    matches.append({'submission_id': key, 'distance': distance})
+                    if limit is not None and len(matches) >= limit:
+                        return matches
+            return matches
+
+    def get_result(self, key: Hashable) -> Any:
+        """Return the cached grading result for a submission, if any"""
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def clear(self):
+        """Remove every entry from the index"""
+        with self._lock:
+            for table in self._tables:
+                table.clear()
+            self._groups.clear()
+            self._entries.clear()
+            self._results.clear()
+
+
+# Shared index so duplicates are detected across grading requests
+submission_index = PerceptualHashIndex()
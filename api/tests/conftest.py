@@ -0,0 +1,43 @@
+import base64
+import io
+import os
+import random
+import sys
+
+import pytest
+
+# The API modules are flat scripts imported by name (e.g. ``import perceptual_hash``)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def render_page(seed: int, width: int = 400, height: int = 300):
+    """Draw a small fake handwritten page as a grayscale PIL image"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    image = Image.new('L', (width, height), color=rng.randint(220, 255))
+    draw = ImageDraw.Draw(image)
+    for baseline in range(30, height - 20, 30):
+        x = rng.randint(10, 30)
+        while x < width - 40:
+            points = [(x, baseline)]
+            for _ in range(rng.randint(3, 6)):
+                x += rng.randint(4, 10)
+                points.append((x, baseline - rng.randint(0, 15)))
+            draw.line(points, fill=rng.randint(0, 80), width=2)
+            x += rng.randint(10, 25)
+    return image
+
+
+def encode_upload(image) -> str:
+    """Encode an image as the base64 PNG data URL sent by the frontend"""
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+@pytest.fixture
+def make_upload():
+    """Factory for synthetic uploads: ``make_upload(seed)`` -> data URL"""
+    pytest.importorskip('PIL')
+    return lambda seed, **size: encode_upload(render_page(seed, **size))
@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+from grading_profiler import GradingProfiler, aggregate_profiles
+
+
+def busy_work():
+    return sum(i * i for i in range(50000))
+
+
+def test_profile_writes_report_files(tmp_path):
+    profiler = GradingProfiler(str(tmp_path), sample_rate=1.0, sampling_interval=0.001)
+    with profiler.profile('test', {'assignment_type': 'essay'}) as request_id:
+        busy_work()
+
+    with open(tmp_path / f"{request_id}.json") as f:
+        report = json.load(f)
+    assert report['label'] == 'test'
+    assert report['metadata'] == {'assignment_type': 'essay'}
+    for name in report['files'].values():
+        assert os.path.exists(tmp_path / name)
+    assert any('busy_work' in row['function'] for row in report['top_functions'])
+
+
+def test_aggregate_merges_requests(tmp_path):
+    profiler = GradingProfiler(str(tmp_path), sample_rate=1.0, sampling_interval=0.001)
+    for _ in range(3):
+        with profiler.profile('test'):
+            busy_work()
+
+    merged = tmp_path / 'merged.collapsed'
+    summary = aggregate_profiles(str(tmp_path), str(merged), top_n=5)
+    assert summary['requests'] == 3
+    assert len(summary['top_functions']) == 5
+    assert merged.exists()
+
+
+@pytest.mark.parametrize('name,value', [
+    ('GRADING_PROFILE_SAMPLE_RATE', 'often'),
+    ('GRADING_PROFILE_SAMPLE_RATE', '2'),
+    ('GRADING_PROFILE_INTERVAL', 'fast'),
+])
+def test_from_env_ignores_bad_configuration(monkeypatch, tmp_path, name, value):
+    monkeypatch.setenv('GRADING_PROFILE_DIR', str(tmp_path))
+    monkeypatch.setenv(name, value)
+    assert GradingProfiler.from_env() is None
+
+
+def test_from_env_disabled_when_unset(monkeypatch):
+    monkeypatch.delenv('GRADING_PROFILE_DIR', raising=False)
+    assert GradingProfiler.from_env() is None
+
+
+def test_explicit_none_disables_env_profiler(monkeypatch, tmp_path):
+    pytest.importorskip('PIL')
+    import handwriting_grading_simple
+
+    env_profiler = GradingProfiler(str(tmp_path), sample_rate=1.0)
+    monkeypatch.setattr(handwriting_grading_simple, 'request_profiler', env_profiler)
+
+    handwriting_grading_simple.handle_grading_request({}, profiler=None)
+    assert os.listdir(tmp_path) == []
+
+    handwriting_grading_simple.handle_grading_request({})
+    assert any(name.endswith('.json') for name in os.listdir(tmp_path))
@@ -0,0 +1,93 @@
+import json
+import random
+
+import pytest
+
+from grading_results import GradingResult, QualityMetrics
+
+LEGACY_KEYS = [
+    'overall_score', 'accuracy', 'completeness', 'legibility', 'presentation', 'grade',
+    'feedback', 'suggestions', 'time_spent', 'quality_metrics', 'processing_timestamp',
+    'assignment_type'
+]
+
+
+def make_result(**changes):
+    values = dict(
+        overall_score=92.5, accuracy=95.0, completeness=88.0, legibility=85.3, presentation=90.0,
+        grade='A-', feedback=['Excellent accuracy in your work'],
+        suggestions=['Practice writing more clearly and consistently'], time_spent=25,
+        quality_metrics=QualityMetrics(0.045, 12.3, 0.78, 85.5),
+        processing_timestamp='2024-02-20T10:30:00', assignment_type='mathematics'
+    )
+    values.update(changes)
+    return GradingResult(**values)
+
+
+def test_to_dict_matches_legacy_response_shape():
+    result = make_result()
+    data = result.to_dict()
+
+    assert list(data) == LEGACY_KEYS
+    assert data['quality_metrics'] == {
+        'edge_density': 0.045, 'stroke_consistency': 12.3,
+        'line_straightness': 0.78, 'legibility_score': 85.5
+    }
+    assert json.loads(result.to_json()) == data
+
+
+def test_optional_fields_only_emitted_when_set():
+    data = make_result(submission_id='s1', perceptual_hash='00ff00ff00ff00ff',
+                       near_duplicates=[{'submission_id': 's0', 'distance': 1}]).to_dict()
+
+    assert list(data) == LEGACY_KEYS + ['submission_id', 'perceptual_hash', 'near_duplicates']
+
+
+@pytest.mark.parametrize('changes', [
+    {},
+    {'feedback': [], 'suggestions': []},
+    {'submission_id': 's1', 'perceptual_hash': 'ffffffffffffffff', 'reused_from': 's0',
+     'near_duplicates': [{'submission_id': 's0', 'distance': 0}, {'submission_id': 'é', 'distance': 5}]},
+    {'near_duplicates': []},
+])
+def test_binary_round_trip(changes):
+    result = make_result(**changes)
+    assert GradingResult.from_bytes(result.to_bytes()).to_dict() == result.to_dict()
+
+
+def test_binary_form_is_smaller_than_json():
+    result = make_result(submission_id='s1', perceptual_hash='00ff00ff00ff00ff')
+    assert len(result.to_bytes()) < len(result.to_json())
+
+
+def test_binary_rejects_counts_colliding_with_none_marker():
+    duplicates = [{'submission_id': 'x', 'distance': 0}] * 0xFFFF
+    with pytest.raises(ValueError):
+        make_result(near_duplicates=duplicates).to_bytes()
+    with pytest.raises(ValueError):
+        make_result(feedback=['ok'] * 0xFFFF).to_bytes()
+
+
+def test_binary_rejects_unknown_version():
+    data = bytearray(make_result().to_bytes())
+    data[0] = 99
+    with pytest.raises(ValueError):
+        GradingResult.from_bytes(bytes(data))
+
+
+def test_numpy_scalars_become_plain_floats():
+    np = pytest.importorskip('numpy')
+    metrics = QualityMetrics(np.float64(0.5), np.float32(1.5), np.int64(2), np.float64(99.0))
+
+    assert all(type(value) is float for value in metrics.to_dict().values())
+    json.dumps(metrics.to_dict())
+
+
+def test_simple_backend_response_is_unchanged(make_upload):
+    from handwriting_grading_simple import SimpleHandwritingGradingSystem
+
+    random.seed(0)
+    results = SimpleHandwritingGradingSystem().grade_assignment(make_upload(0), 'essay')
+
+    assert list(results) == LEGACY_KEYS
+    json.dumps(results)
@@ -0,0 +1,192 @@
+import base64
+import io
+import random
+
+import pytest
+
+pytest.importorskip('cv2')
+pytest.importorskip('tensorflow')
+
+from PIL import Image, ImageDraw
+
+import handwriting_grading
+from conftest import encode_upload, render_page
+from grading_results import GradingResult
+from handwriting_grading import HandwritingGradingSystem, redact_duplicate_details
+from perceptual_hash import PerceptualHashIndex
+
+
+def render_worksheet(student_seed: int, width: int = 400, height: int = 300):
+    """A printed worksheet shared by the class with one student's short answers"""
+    image = Image.new('L', (width, height), color=250)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((10, 10, width - 10, 40), fill=60)
+    for row, top in enumerate(range(55, height - 40, 60)):
+        draw.text((15, top), f"Q{row + 1}. Solve for x", fill=0)
+        draw.rectangle((40, top + 15, width - 20, top + 50), outline=0, width=2)
+
+    rng = random.Random(student_seed)
+    for top in range(55, height - 40, 60):
+        x = 50
+        while x < rng.randint(55, 70):
+            points = [(x, top + 40)]
+            for _ in range(rng.randint(3, 6)):
+                x += rng.randint(3, 8)
+                points.append((x, top + 40 - rng.randint(0, 18)))
+            draw.line(points, fill=rng.randint(0, 80), width=2)
+            x += rng.randint(8, 18)
+    return image
+
+
+def reencode_as_jpeg(upload: str) -> str:
+    """The same page uploaded again as a recompressed JPEG (different file bytes)"""
+    image = Image.open(io.BytesIO(base64.b64decode(upload.split(',', 1)[1])))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=70)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def make_system(**options):
+    return HandwritingGradingSystem(hash_index=PerceptualHashIndex(), **options)
+
+
+@pytest.fixture
+def page():
+    return encode_upload(render_page(1))
+
+
+def test_evaluate_assignment_returns_result_object(page):
+    result = make_system().evaluate_assignment(page, 'essay', submission_id='s1')
+
+    assert isinstance(result, GradingResult)
+    assert result.assignment_type == 'essay'
+    assert (result.accuracy, result.completeness) == (89.0, 91.0)
+    assert result.submission_id == 's1'
+    assert len(result.perceptual_hash) == 16
+    assert result.near_duplicates == []
+    assert result.reused_from is None
+
+
+def test_reuse_off_caches_nothing(page):
+    system = make_system()
+    system.evaluate_assignment(page, 'essay', assignment_id='hw1')
+    second = system.evaluate_assignment(page, 'essay', assignment_id='hw1')
+
+    assert len(second.near_duplicates) == 1
+    assert second.reused_from is None
+    assert system.hash_index.get_result(second.near_duplicates[0]['submission_id']) is None
+
+
+def test_reuse_without_assignment_id_caches_nothing(page):
+    system = make_system(reuse_duplicate_results=True)
+    system.evaluate_assignment(page, 'essay')
+    second = system.evaluate_assignment(page, 'essay')
+
+    assert second.reused_from is None
+    assert system.hash_index.get_result(second.near_duplicates[0]['submission_id']) is None
+
+
+def test_identical_bytes_reuse_grade(page):
+    # A negative tolerance rules out the thumbnail check, leaving the sha256 match
+    system = make_system(reuse_duplicate_results=True, reuse_pixel_tolerance=-1)
+    first = system.evaluate_assignment(page, 'essay', submission_id='s1', assignment_id='hw1')
+    second = system.evaluate_assignment(page, 'essay', submission_id='s2', assignment_id='hw1')
+
+    assert second.reused_from == 's1'
+    assert second.submission_id == 's2'
+    assert second.overall_score == first.overall_score
+
+
+def test_recompressed_copy_is_confirmed_by_thumbnail(page):
+    system = make_system(reuse_duplicate_results=True)
+    system.evaluate_assignment(page, 'essay', submission_id='s1', assignment_id='hw1')
+    copy = system.evaluate_assignment(reencode_as_jpeg(page), 'essay', submission_id='s2', assignment_id='hw1')
+
+    assert copy.reused_from == 's1'
+
+    strict = make_system(reuse_duplicate_results=True, reuse_pixel_tolerance=0)
+    strict.evaluate_assignment(page, 'essay', submission_id='s1', assignment_id='hw1')
+    copy = strict.evaluate_assignment(reencode_as_jpeg(page), 'essay', submission_id='s2', assignment_id='hw1')
+
+    assert copy.reused_from is None
+
+
+@pytest.mark.parametrize('assignment_id, assignment_type', [('hw2', 'mathematics'), ('hw1', 'essay')])
+def test_reuse_is_scoped_to_assignment_id_and_type(page, assignment_id, assignment_type):
+    system = make_system(reuse_duplicate_results=True)
+    system.evaluate_assignment(page, 'mathematics', submission_id='s1', assignment_id='hw1')
+    second = system.evaluate_assignment(page, assignment_type, submission_id='s2', assignment_id=assignment_id)
+    fresh = make_system().evaluate_assignment(page, assignment_type)
+
+    assert second.reused_from is None
+    assert second.assignment_type == assignment_type
+    assert (second.accuracy, second.completeness) == (fresh.accuracy, fresh.completeness)
+
+
+def test_client_submission_id_cannot_replace_another_entry(page):
+    system = make_system(reuse_duplicate_results=True)
+    system.evaluate_assignment(page, 'essay', submission_id='s1', assignment_id='hw1')
+    system.evaluate_assignment(encode_upload(render_page(2)), 'essay', submission_id='s1', assignment_id='hw1')
+    copy = system.evaluate_assignment(page, 'essay', submission_id='s3', assignment_id='hw1')
+
+    assert len(system.hash_index) == 3
+    assert copy.reused_from == 's1'
+    assert copy.near_duplicates[0]['distance'] == 0
+
+
+def test_candidates_beyond_reuse_distance_are_not_checked(page):
+    system = make_system(reuse_duplicate_results=True, reuse_max_distance=2)
+    record = {'result': object(), 'assignment_id': 'hw1', 'assignment_type': 'essay',
+              'content_digest': 'digest', 'thumbnail': bytes(4)}
+    system.hash_index.add('wrong-type', 0, dict(record, assignment_type='general'))
+    system.hash_index.add('too-far', 0, record)
+    near_duplicates = [{'submission_id': 'wrong-type', 'distance': 1},
+                       {'submission_id': 'too-far', 'distance': 3}]
+
+    assert system.get_reusable_result(near_duplicates, 'hw1', 'essay', 'digest', bytes(4)) is None
+    near_duplicates[1]['distance'] = 2
+    assert system.get_reusable_result(near_duplicates, 'hw1', 'essay', 'digest', bytes(4)) is record['result']
+
+
+def test_shared_template_pages_match_but_never_reuse():
+    system = make_system(reuse_duplicate_results=True)
+    worksheets = [encode_upload(render_worksheet(student)) for student in range(8)]
+    results = [system.evaluate_assignment(worksheet, 'mathematics', submission_id=f"s{student}", assignment_id='hw1')
+               for student, worksheet in enumerate(worksheets)]
+
+    # The printed template dominates the 64-bit hash, so unrelated students' pages "match"
+    assert all(result.near_duplicates for result in results[1:])
+    assert min(match['distance'] for result in results[1:] for match in result.near_duplicates) <= 2
+    assert all(result.reused_from is None for result in results)
+
+    resubmitted = system.evaluate_assignment(reencode_as_jpeg(worksheets[3]), 'mathematics',
+                                             submission_id='s3-again', assignment_id='hw1')
+    assert resubmitted.reused_from == 's3'
+
+
+def test_redact_duplicate_details():
+    results = {'grade': 'A', 'near_duplicates': [{'submission_id': 'other', 'distance': 1}], 'reused_from': 'other'}
+
+    assert redact_duplicate_details(results) == {
+        'grade': 'A', 'near_duplicate_count': 1, 'reused_duplicate_result': True
+    }
+    assert redact_duplicate_details({'grade': 'A'}) == {'grade': 'A'}
+
+
+def test_handle_grading_request_redacts_other_submissions(page, monkeypatch):
+    monkeypatch.setattr(handwriting_grading, 'submission_index', PerceptualHashIndex())
+    monkeypatch.setattr(handwriting_grading, 'REUSE_DUPLICATE_RESULTS', True)
+
+    def grade(submission_id):
+        return handwriting_grading.handle_grading_request({
+            'image_data': page, 'assignment_type': 'essay',
+            'assignment_id': 'hw1', 'submission_id': submission_id
+        }, profiler=None)
+
+    grade('s1')
+    results = grade('s2')
+
+    assert results['near_duplicate_count'] == 1
+    assert results['reused_duplicate_result'] is True
+    assert 'near_duplicates' not in results and 'reused_from' not in results
+    assert 's1' not in str(results)
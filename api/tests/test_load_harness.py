@@ -0,0 +1,115 @@
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('PIL')
+
+import local_server
+from load_test import LoadGenerator, UploadSource
+
+
+@pytest.fixture
+def server():
+    instance = local_server.GradingServer(('127.0.0.1', 0), 'simple')
+    thread = threading.Thread(target=instance.serve_forever, daemon=True)
+    thread.start()
+    yield instance
+    instance.shutdown()
+    instance.server_close()
+
+
+def base_url(instance):
+    return f"http://127.0.0.1:{instance.server_address[1]}"
+
+
+def run(url, uploads, **options):
+    options.setdefault('total_requests', 6)
+    generator = LoadGenerator(url, uploads, concurrency=2, stats_interval=0.05, timeout=5, **options)
+    return generator.run()
+
+
+def test_grade_success_and_memory_samples(server, make_upload):
+    summary = run(base_url(server), UploadSource(pages=[make_upload(0), make_upload(1)]))
+
+    assert summary['statuses'] == {'200': 6}
+    assert summary['error_rate'] == 0.0
+    assert summary['memory_over_time'][-1]['rss_mb'] > 0
+
+
+def test_bad_upload_is_client_error(server):
+    summary = run(base_url(server), UploadSource(pages=['not base64!']))
+
+    assert summary['statuses'] == {'400': 6}
+
+
+def test_backend_failure_is_server_error(server, monkeypatch, make_upload):
+    monkeypatch.setattr(server.backend, 'handle_grading_request',
+                        lambda data: {'error': True, 'message': 'boom'})
+    summary = run(base_url(server), UploadSource(pages=[make_upload(0)]))
+
+    assert summary['statuses'] == {'500': 6}
+
+
+def test_closed_loop_latency_excludes_building_the_request(server, monkeypatch, make_upload):
+    class SlowUploads(UploadSource):
+        def get(self, request_number):
+            time.sleep(0.2)
+            return super().get(request_number)
+
+    monkeypatch.setattr(server.backend, 'handle_grading_request', lambda data: {})
+    summary = run(base_url(server), SlowUploads(pages=[make_upload(0)]))
+
+    assert summary['statuses'] == {'200': 6}
+    assert summary['latency_ms']['max'] < 200
+    assert summary['upload_starvation'] == {'starved_requests': 0, 'wait_seconds': 0.0}
+
+
+def test_fresh_pages_are_unique_and_starvation_is_counted():
+    uploads = UploadSource(prefetch=2)
+    try:
+        # Nothing is rendered yet right after start-up
+        pages = [uploads.get(n) for n in range(5)]
+        assert uploads.starvation()[0] >= 1
+
+        assert uploads.wait_until_ready(timeout=30)
+        starved = uploads.starvation()[0]
+        pages += [uploads.get(n) for n in range(2)]
+        assert uploads.starvation()[0] == starved
+    finally:
+        uploads.close()
+    assert len(set(pages)) == 7
+
+
+def test_truncated_responses_are_recorded_as_errors():
+    # Promises 100 bytes, sends 2, then hangs up -> http.client.IncompleteRead
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(16)
+    stop = threading.Event()
+
+    def serve():
+        listener.settimeout(0.1)
+        while not stop.is_set():
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                continue
+            with conn:
+                conn.recv(65536)
+                conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 100\r\n\r\n{}")
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{listener.getsockname()[1]}"
+        summary = run(url, UploadSource(pages=['unused']), endpoint='/api/feedback')
+    finally:
+        stop.set()
+        thread.join()
+        listener.close()
+
+    assert summary['requests'] == 6
+    assert summary['error_rate'] == 1.0
+    assert summary['statuses'] == {'IncompleteRead': 6}
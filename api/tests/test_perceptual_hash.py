@@ -0,0 +1,136 @@
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from perceptual_hash import (PerceptualHashIndex, dhash, hamming_distance, max_pixel_difference,
+                             thumbnail_signature)
+
+
+def flip_bits(value, count, rng):
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def brute_force(hashes, query, max_distance, exclude=None):
+    return sorted(
+        (hamming_distance(query, value), key)
+        for key, value in hashes.items()
+        if key != exclude and hamming_distance(query, value) <= max_distance
+    )
+
+
+def as_pairs(matches):
+    return sorted((match['distance'], match['submission_id']) for match in matches)
+
+
+def draw_page(seed, size=(800, 600)):
+    rng = random.Random(seed)
+    image = Image.new('L', size, color=240)
+    draw = ImageDraw.Draw(image)
+    for _ in range(60):
+        x, y = rng.randrange(size[0] - 100), rng.randrange(size[1] - 40)
+        draw.line([(x, y), (x + rng.randint(20, 100), y + rng.randint(-30, 30))], fill=20, width=3)
+    return image
+
+
+@pytest.mark.parametrize('max_distance,num_bands', [(0, 1), (3, 2), (5, 3), (7, 4), (9, 3)])
+def test_query_matches_brute_force(max_distance, num_bands):
+    rng = random.Random(max_distance * 100 + num_bands)
+    index = PerceptualHashIndex(max_distance=max_distance, num_bands=num_bands)
+    hashes = {}
+    for key in range(400):
+        hashes[key] = rng.getrandbits(64)
+        index.add(key, hashes[key])
+    # Clusters of near-identical hashes so every distance actually occurs
+    for key in range(400, 600):
+        hashes[key] = flip_bits(hashes[rng.randrange(400)], rng.randint(0, max_distance + 1), rng)
+        index.add(key, hashes[key])
+
+    for _ in range(200):
+        query = flip_bits(hashes[rng.randrange(600)], rng.randint(0, max_distance + 2), rng)
+        for distance in range(max_distance + 1):
+            expected = brute_force(hashes, query, distance)
+            assert as_pairs(index.query(query, max_distance=distance, limit=None)) == expected
+
+
+def test_query_limit_returns_nearest_first():
+    index = PerceptualHashIndex(max_distance=4)
+    for key in range(20000):
+        index.add(key, 0)
+    index.add('near', 1)
+
+    matches = index.query(0, limit=5)
+    assert len(matches) == 5
+    assert all(match['distance'] == 0 for match in matches)
+    assert index.query(1, limit=1) == [{'submission_id': 'near', 'distance': 0}]
+
+
+def test_re_adding_key_replaces_entry():
+    index = PerceptualHashIndex()
+    first, second = 0, (1 << 64) - 1
+    index.add('a', first, result='first')
+    index.add('a', second, result='second')
+
+    assert len(index) == 1
+    assert index.query(first) == []
+    assert index.query(second) == [{'submission_id': 'a', 'distance': 0}]
+    assert index.get_result('a') == 'second'
+    assert index._groups == {second: {'a': None}}
+
+
+def test_exclude_skips_own_submission():
+    index = PerceptualHashIndex()
+    index.add('self', 42)
+    index.add('other', 43)
+
+    assert as_pairs(index.query(42, exclude='self')) == [(1, 'other')]
+
+
+def test_entries_and_results_are_bounded():
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(5)]
+    index = PerceptualHashIndex(max_entries=3, max_cached_results=2)
+    for key, value in enumerate(hashes):
+        index.add(key, value, result=f"result-{key}")
+
+    assert len(index) == 3
+    assert index.query(hashes[0]) == []
+    assert index.get_result(1) is None
+    assert [index.get_result(key) for key in (3, 4)] == ['result-3', 'result-4']
+
+
+def test_results_cached_only_when_given():
+    index = PerceptualHashIndex()
+    index.add('a', 7)
+    assert index.get_result('a') is None
+
+
+def test_dhash_stable_under_rescaling():
+    for seed in range(5):
+        page = draw_page(seed)
+        original = dhash(page)
+        for size in [(400, 300), (1600, 1200), (640, 480)]:
+            assert hamming_distance(original, dhash(page.resize(size, Image.LANCZOS))) <= 3
+
+
+def test_dhash_separates_different_pages():
+    hashes = [dhash(draw_page(seed)) for seed in range(5)]
+    for i in range(len(hashes)):
+        for j in range(i + 1, len(hashes)):
+            assert hamming_distance(hashes[i], hashes[j]) > 5
+
+
+def test_thumbnail_ignores_rescaling_but_not_local_changes():
+    page = draw_page(0)
+    signature = thumbnail_signature(page)
+    assert len(signature) == 32 * 32
+    assert max_pixel_difference(signature, thumbnail_signature(page.resize((400, 300), Image.LANCZOS))) <= 24
+
+    edited = page.copy()
+    ImageDraw.Draw(edited).line([(100, 100), (160, 120)], fill=0, width=3)
+    assert max_pixel_difference(signature, thumbnail_signature(edited)) > 24
+
+    with pytest.raises(ValueError):
+        max_pixel_difference(signature, thumbnail_signature(page, 16))